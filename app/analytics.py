@@ -0,0 +1,173 @@
+import networkx as nx
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+
+# analytics.py
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_TOL = 1e-8
+PAGERANK_MAX_ITER = 100
+
+
+def build_adjacency(nodes: List[Dict], edges: List[Dict]) -> Tuple[List[str], sparse.csr_matrix]:
+    """
+    Build a symmetric weighted adjacency matrix from merged nodes/edges.
+    Edge endpoints the model never listed as characters still get a row,
+    so the graph structure is complete.
+    """
+    ids = [node["id"] for node in nodes]
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    rows, cols, weights = [], [], []
+    for edge in edges:
+        source, target = edge["source"], edge["target"]
+        if source == target:
+            continue
+        for name in (source, target):
+            if name not in index:
+                index[name] = len(ids)
+                ids.append(name)
+        weight = float(edge.get("weight", 1) or 1)
+        rows += [index[source], index[target]]
+        cols += [index[target], index[source]]
+        weights += [weight, weight]
+
+    n = len(ids)
+    # Duplicate (row, col) pairs are summed on conversion
+    adj = sparse.coo_matrix((weights, (rows, cols)), shape=(n, n)).tocsr()
+    return ids, adj
+
+
+def degree_centrality(adj: sparse.csr_matrix) -> np.ndarray:
+    """Fraction of the other characters each character interacts with."""
+    n = adj.shape[0]
+    if n <= 1:
+        return np.zeros(n)
+    return np.diff(adj.indptr) / (n - 1)
+
+
+def weighted_degree(adj: sparse.csr_matrix) -> np.ndarray:
+    """Total interaction weight per character."""
+    return np.asarray(adj.sum(axis=1)).ravel()
+
+
+def pagerank(adj: sparse.csr_matrix) -> np.ndarray:
+    """Weighted PageRank by power iteration on the sparse transition matrix."""
+    n = adj.shape[0]
+    if n == 0:
+        return np.zeros(0)
+
+    out_weight = weighted_degree(adj)
+    dangling = out_weight == 0
+    inv = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+    transition_t = (sparse.diags(inv) @ adj).T.tocsr()
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(PAGERANK_MAX_ITER):
+        # Rank held by isolated characters is spread uniformly, like networkx
+        new_rank = PAGERANK_DAMPING * (transition_t @ rank)
+        new_rank += (PAGERANK_DAMPING * rank[dangling].sum() + 1 - PAGERANK_DAMPING) / n
+        if np.abs(new_rank - rank).sum() < n * PAGERANK_TOL:
+            return new_rank
+        rank = new_rank
+    return rank
+
+
+def betweenness(graph: nx.Graph, n: int) -> np.ndarray:
+    """
+    Betweenness centrality with distance = 1 / weight (frequent partners are "closer").
+    Sampled over ANALYTICS_BETWEENNESS_SAMPLE sources for large casts.
+    """
+    if n <= 2:
+        return np.zeros(n)
+    sample = settings.ANALYTICS_BETWEENNESS_SAMPLE
+    scores = nx.betweenness_centrality(
+        graph,
+        k=sample if 0 < sample < n else None,
+        weight="distance",
+        normalized=True,
+        seed=0,
+    )
+    return np.array([scores[i] for i in range(n)])
+
+
+def communities(graph: nx.Graph, n: int) -> np.ndarray:
+    """Louvain communities, numbered from the largest (0) down."""
+    if graph.number_of_edges() == 0:
+        return np.arange(n)
+    labels = np.zeros(n, dtype=int)
+    groups = nx.community.louvain_communities(graph, weight="weight", seed=0)
+    for label, members in enumerate(sorted(groups, key=len, reverse=True)):
+        labels[list(members)] = label
+    return labels
+
+
+def compute_analytics(result: Dict) -> Dict:
+    """
+    Compute per-character graph metrics for a merged analysis result.
+    Returns {"metrics": {node_id: {...}}, "community_count": int}.
+    """
+    ids, adj = build_adjacency(result.get("nodes", []), result.get("edges", []))
+    n = len(ids)
+
+    graph = nx.from_scipy_sparse_array(adj, edge_attribute="weight")
+    for _, _, data in graph.edges(data=True):
+        data["distance"] = 1.0 / data["weight"]
+
+    degree = degree_centrality(adj)
+    strength = weighted_degree(adj)
+    between = betweenness(graph, n)
+    rank = pagerank(adj)
+    community = communities(graph, n)
+
+    metrics = {
+        node_id: {
+            "degree_centrality": round(float(degree[i]), 6),
+            "weighted_degree": round(float(strength[i]), 6),
+            "betweenness": round(float(between[i]), 6),
+            "pagerank": round(float(rank[i]), 6),
+            "community": int(community[i]),
+        }
+        for i, node_id in enumerate(ids)
+    }
+    return {"metrics": metrics, "community_count": int(community.max()) + 1 if n else 0}
+
+
+def attach_analytics(result: Dict, analytics: Dict) -> Dict:
+    """Return a copy of the result with metrics merged into each node."""
+    attached = dict(result)
+    attached["nodes"] = [{**node, **analytics["metrics"].get(node["id"], {})} for node in result.get("nodes", [])]
+    attached["community_count"] = analytics["community_count"]
+    return attached
+
+
+def find_node(result: Dict, character: str) -> Optional[str]:
+    """Find a node id by name or alias, case-insensitively."""
+    wanted = character.strip().lower()
+    for node in result.get("nodes", []):
+        names = [node["id"], *node.get("aliases", [])]
+        if any(name.lower() == wanted for name in names):
+            return node["id"]
+    return None
+
+
+def ego_subgraph(result: Dict, center: str, radius: int = 1) -> Dict:
+    """Return the nodes/edges within `radius` hops of one character."""
+    ids, adj = build_adjacency(result.get("nodes", []), result.get("edges", []))
+    hops = csgraph.shortest_path(adj, unweighted=True, directed=False, indices=ids.index(center))
+    keep = {ids[i] for i in np.flatnonzero(hops <= radius)}
+
+    nodes = [node for node in result.get("nodes", []) if node["id"] in keep]
+    # Endpoints that only appear in edges have no node to return, so drop their edges too
+    node_ids = {node["id"] for node in nodes}
+    edges = [e for e in result.get("edges", []) if e["source"] in node_ids and e["target"] in node_ids]
+    return {
+        "center": center,
+        "radius": radius,
+        "nodes": nodes,
+        "edges": edges,
+        "character_count": len(nodes),
+        "interaction_count": len(edges),
+    }
@@ -1,15 +1,19 @@
+import asyncio
+import hashlib
 import json
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from llama_index.core import Document, Settings
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core.schema import TextNode
-from llama_index.llms.openai import OpenAI
-from llama_index.llms.ollama import Ollama
-from llama_index.llms.groq import Groq
-from llama_index.llms.gemini import Gemini
 from llama_index.core.llms import LLM
 from llama_index.core.prompts import PromptTemplate
 from app.config import settings
+from app import llm as native_llm
+from app.cache import chapter_cache
+from app.cascade import escalation_reason
+from app.gutenberg import split_chapters
+from app.ollama_tuning import get_num_ctx, get_parallel_slots
+from app.providers import get_llm_class
 
 # analyzer.py
 
@@ -50,92 +54,302 @@ Text to analyze:
 {text}"""
 )
 
+# Same shape as the prompt above, for providers with structured outputs
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "characters": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "aliases": {"type": "array", "items": {"type": "string"}},
+                    "mention_count": {"type": "integer"},
+                    "sample_quotes": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": ["name", "aliases", "mention_count", "sample_quotes"],
+                "additionalProperties": False,
+            },
+        },
+        "interactions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "source": {"type": "string"},
+                    "target": {"type": "string"},
+                    "weight": {"type": "integer"},
+                    "sample_quotes": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": ["source", "target", "weight", "sample_quotes"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["characters", "interactions"],
+    "additionalProperties": False,
+}
+
 class BookAnalyzer:
-    def __init__(self, provider: str = None, model: str = None):
-        """Initialize the analyzer with specified LLM provider and model."""
+    def __init__(self, provider: str = None, model: str = None, backend: str = None, cascade: bool = False):
+        """
+        Initialize the analyzer with specified LLM provider and model.
+        backend: "llama_index" (LlamaIndex LLM wrappers) or "native" (app.llm client).
+        cascade: send every chunk to the cheap CASCADE_FAST_* model first and only
+        escalate chunks with bad answers to the requested provider/model.
+        """
         self.provider = provider or settings.PROVIDER
         self.model = model
-        self.llm = self._setup_llm()
+        self.backend = backend or settings.LLM_BACKEND
+        if self.backend not in ("llama_index", "native"):
+            raise ValueError(f"Unsupported backend: {self.backend}")
+        self.cascade = cascade
+        self.llm = self._setup_llm() if self.backend == "llama_index" else None
+        
+        # "fast" is the cascade's first tier; "strong" is the requested model
+        self.tiers = {}
+        if cascade:
+            fast_provider, fast_model = settings.CASCADE_FAST_PROVIDER, settings.CASCADE_FAST_MODEL
+            self.tiers["fast"] = {
+                "provider": fast_provider,
+                "model": fast_model,
+                "llm": self._setup_llm(fast_provider, fast_model) if self.backend == "llama_index" else None,
+            }
+        self.tiers["strong"] = {"provider": self.provider, "model": self.model, "llm": self.llm}
+        self.tier_calls = {tier: 0 for tier in self.tiers}
+        self.escalations = {"truncated": 0, "parse_error": 0, "missed_names": 0, "error": 0}
+        
+        # Most calls go to the first tier, so size concurrency for it
+        first = self.tiers["fast" if cascade else "strong"]
+        self.concurrency = self._get_concurrency(first["provider"], first["model"])
+        self.token_usage = {"prompt_tokens": 0, "completion_tokens": 0}
         
         # Configure LlamaIndex settings
-        Settings.llm = self.llm
+        if self.llm is not None:
+            Settings.llm = self.llm
         Settings.chunk_size = settings.CHUNK_SIZE
         Settings.chunk_overlap = settings.CHUNK_OVERLAP
     
-    def _setup_llm(self) -> LLM:
-        """Set up the LLM based on provider."""
-        if self.provider == "openai":
-            return OpenAI(
+    def _setup_llm(self, provider: str = None, model: str = None) -> LLM:
+        """Set up the LLM based on provider (defaults to the analyzer's own)."""
+        if provider is None:
+            provider, model = self.provider, self.model
+        llm_class = get_llm_class(provider)
+        if provider == "openai":
+            return llm_class(
                 api_key=settings.OPENAI_API_KEY,
-                model=self.model or settings.OPENAI_MODEL,
+                model=model or settings.OPENAI_MODEL,
                 temperature=settings.TEMPERATURE,
             )
-        elif self.provider == "groq":
-            return Groq(
+        elif provider == "groq":
+            return llm_class(
                 api_key=settings.GROQ_API_KEY,
-                model=self.model or settings.GROQ_MODEL,
+                model=model or settings.GROQ_MODEL,
                 temperature=settings.TEMPERATURE,
             )
-        elif self.provider == "gemini":
-            return Gemini(
+        elif provider == "gemini":
+            return llm_class(
                 api_key=settings.GEMINI_API_KEY,
-                model=self.model or settings.GEMINI_MODEL,
+                model=model or settings.GEMINI_MODEL,
                 temperature=settings.TEMPERATURE,
             )
-        elif self.provider == "ollama":
-            return Ollama(
+        elif provider == "ollama":
+            return llm_class(
                 base_url=settings.OLLAMA_BASE_URL,
-                model=self.model or settings.OLLAMA_MODEL,
+                model=model or settings.OLLAMA_MODEL,
                 temperature=settings.TEMPERATURE,
                 request_timeout=120.0,
                 json_mode=True,
+                keep_alive=settings.OLLAMA_KEEP_ALIVE,
+                context_window=get_num_ctx(),
             )
-        elif self.provider == "sambanova":
+        elif provider == "sambanova":
             # SambaNova uses OpenAI-compatible API
-            return OpenAI(
+            return llm_class(
                 api_key=settings.SAMBANOVA_API_KEY,
                 api_base=settings.SAMBANOVA_API_URL.replace("/chat/completions", ""),
-                model=self.model or settings.SAMBANOVA_MODEL,
+                model=model or settings.SAMBANOVA_MODEL,
                 temperature=settings.TEMPERATURE,
             )
         else:
-            raise ValueError(f"Unsupported provider: {self.provider}")
+            raise ValueError(f"Unsupported provider: {provider}")
     
-    def analyze(self, text: str) -> Dict:
+    def _get_concurrency(self, provider: str, model: str = None) -> int:
+        """How many chunks to send at once. Local Ollama is sized to its parallel slots."""
+        if provider == "ollama":
+            return get_parallel_slots(model or settings.OLLAMA_MODEL)
+        return max(1, settings.LLM_CONCURRENCY)
+    
+    async def analyze(self, text: str, chapters: Optional[List[int]] = None, refresh: bool = False) -> Dict:
         """
         Analyze a book text to extract characters and relationships.
+        
+        The text is split into chapters which are analyzed in parallel and cached
+        individually, so re-running a book (or a different chapter selection) only
+        calls the LLM for chapters it hasn't seen. `chapters` selects 1-based
+        chapter numbers; None means the whole book. `refresh` skips cached chapters
+        (fresh results still replace them in the cache).
         """
-        # Create document and split into chunks
-        document = Document(text=text)
+        all_chapters = await asyncio.to_thread(split_chapters, text)
+        if chapters is None:
+            selected = all_chapters
+        else:
+            wanted = set(chapters)
+            selected = [chapter for chapter in all_chapters if chapter["index"] in wanted]
+            if not selected:
+                raise ValueError(f"No such chapters; the book has {len(all_chapters)}")
+        
+        # One semaphore for the whole book keeps total in-flight requests at `concurrency`
+        semaphore = asyncio.Semaphore(self.concurrency)
+        chapter_results = await asyncio.gather(*(
+            self._analyze_chapter(chapter, semaphore, refresh) for chapter in selected
+        ))
+        
+        # Aggregate graph is merged from every chunk, exactly as for an unsegmented book
+        chunk_results = [result for chapter in chapter_results for result in chapter["chunk_results"]]
+        merged = self._merge_results(chunk_results)
+        merged["chunks_analyzed"] = sum(chapter["chunks_analyzed"] for chapter in chapter_results)
+        merged["chunks_successful"] = len(chunk_results)
+        merged["chapter_count"] = len(all_chapters)
+        merged["chapters_analyzed"] = [chapter["index"] for chapter in selected]
+        merged["chapters_cached"] = sum(1 for chapter in chapter_results if chapter["cached"])
+        merged["timeline"] = [
+            {
+                "index": chapter["index"],
+                "title": chapter["title"],
+                **self._merge_results(result["chunk_results"]),
+                "chunks_analyzed": result["chunks_analyzed"],
+                "chunks_successful": len(result["chunk_results"]),
+            }
+            for chapter, result in zip(selected, chapter_results)
+        ]
+        if self.cascade:
+            merged["cascade"] = {
+                "tiers": {
+                    tier: {
+                        "provider": config["provider"],
+                        "model": config["model"] or f"default ({config['provider']})",
+                        "calls": self.tier_calls[tier],
+                    }
+                    for tier, config in self.tiers.items()
+                },
+                "escalations": dict(self.escalations),
+            }
+        if self.backend == "native":
+            merged["token_usage"] = {
+                **self.token_usage,
+                "total_tokens": self.token_usage["prompt_tokens"] + self.token_usage["completion_tokens"],
+            }
+        
+        return merged
+    
+    def _chapter_cache_key(self, chapter_text: str) -> tuple:
+        """Chapters are cached by content, so a re-segmented book only misses on changed chapters."""
+        digest = hashlib.sha256(chapter_text.encode("utf-8")).hexdigest()
+        tiers = tuple((tier["provider"], tier["model"]) for tier in self.tiers.values())
+        return (tiers, self.backend, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, digest)
+    
+    async def _analyze_chapter(self, chapter: Dict, semaphore: asyncio.Semaphore, refresh: bool = False) -> Dict:
+        """
+        Analyze one chapter, or return its cached chunk results unless `refresh` is set.
+        Returns {"chunk_results": [...], "chunks_analyzed": int, "cached": bool}.
+        """
+        cache_key = self._chapter_cache_key(chapter["text"])
+        cached = None if refresh else chapter_cache.get(cache_key)
+        if cached is not None:
+            return {**cached, "cached": True}
+        
+        # Create document and split into chunks (CPU-bound, keep it off the event loop)
+        document = Document(text=chapter["text"])
         parser = SentenceSplitter(
             chunk_size=settings.CHUNK_SIZE,
             chunk_overlap=settings.CHUNK_OVERLAP,
         )
-        nodes = parser.get_nodes_from_documents([document])
+        nodes = await asyncio.to_thread(parser.get_nodes_from_documents, [document])
+        
+        # Analyze chunks, up to `concurrency` at a time (results keep chunk order)
+        outcomes = await asyncio.gather(*(
+            self._try_analyze_chunk(f"{chapter['index']}.{i}", node.text, semaphore)
+            for i, node in enumerate(nodes)
+        ))
+        chunk_results = [result for result in outcomes if result is not None]
         
-        # Analyze each chunk
-        chunk_results = []
-        for i, node in enumerate(nodes):
+        entry = {"chunk_results": chunk_results, "chunks_analyzed": len(nodes)}
+        # Don't pin a chapter with failed chunks; the next request should retry them
+        if len(chunk_results) == len(nodes):
+            chapter_cache.set(cache_key, entry)
+        return {**entry, "cached": False}
+    
+    async def _try_analyze_chunk(self, i: str, chunk_text: str, semaphore: asyncio.Semaphore) -> Optional[Dict]:
+        """Analyze one chunk, returning None if the chunk failed."""
+        async with semaphore:
             try:
-                result = self._analyze_chunk(node.text)
-                chunk_results.append(result)
+                return await self._analyze_chunk(chunk_text)
             except Exception as e:
                 print(f"Error analyzing chunk {i}: {e}")
-                continue
-        
-        # Merge results
-        merged = self._merge_results(chunk_results)
-        merged["chunks_analyzed"] = len(nodes)
-        merged["chunks_successful"] = len(chunk_results)
+                return None
+    
+    async def _complete(self, prompt: str, tier: str = "strong") -> Tuple[str, bool]:
+        """
+        Send a prompt to one tier through the configured backend.
+        Returns (raw answer, truncated). LlamaIndex doesn't report truncation, so it's always False there.
+        """
+        config = self.tiers[tier]
+        self.tier_calls[tier] += 1
+        if self.backend == "native":
+            response = await native_llm.complete(
+                prompt, provider=config["provider"], model=config["model"], json_schema=ANALYSIS_SCHEMA
+            )
+            for key, value in response["usage"].items():
+                self.token_usage[key] += value or 0
+            return response["content"], response["truncated"]
         
-        return merged
+        response = await config["llm"].acomplete(prompt)
+        return response.text, False
     
-    def _analyze_chunk(self, chunk_text: str) -> Dict:
-        """Analyze a single chunk of text."""
+    async def _analyze_chunk(self, chunk_text: str) -> Dict:
+        """Analyze a single chunk of text. Raises ValueError if no answer could be parsed."""
         prompt = ANALYSIS_PROMPT.format(text=chunk_text)
+        if not self.cascade:
+            raw, _ = await self._complete(prompt)
+            return self._require_parsed(self._parse_response(raw))
+        
+        # Cascade: accept the cheap answer unless it is broken or misses obvious names
+        fast_parsed = None
+        try:
+            raw, truncated = await self._complete(prompt, "fast")
+            fast_parsed = self._parse_response(raw)
+            reason = escalation_reason(chunk_text, raw, truncated, fast_parsed)
+        except Exception as e:
+            print(f"Fast tier failed, escalating: {e}")
+            reason = "error"
+        if reason is None:
+            return fast_parsed
         
-        response = self.llm.complete(prompt)
-        content = response.text.strip()
+        self.escalations[reason] += 1
+        try:
+            raw, _ = await self._complete(prompt, "strong")
+        except Exception as e:
+            # Keep the cheap answer rather than losing the chunk
+            if fast_parsed is None:
+                raise
+            print(f"Strong tier failed, keeping fast answer: {e}")
+            return fast_parsed
+        return self._require_parsed(self._parse_response(raw) or fast_parsed)
+    
+    def _require_parsed(self, parsed: Optional[Dict]) -> Dict:
+        """An unparseable answer is a failed chunk, so its chapter isn't cached with an empty graph."""
+        if parsed is None:
+            raise ValueError("Could not parse the model answer as JSON")
+        return parsed
+    
+    def _parse_response(self, raw: str) -> Optional[Dict]:
+        """
+        Extract the JSON object from a model answer, tolerating markdown and stray text.
+        Returns None if no valid JSON could be recovered.
+        """
+        content = raw.strip()
         
         # Clean up response - handle various markdown/formatting
         if "```json" in content:
@@ -177,9 +391,9 @@ class BookAnalyzer:
             return parsed
         except json.JSONDecodeError as e:
             print(f"JSON parse error: {e}")
-            print(f"Raw response: {response.text[:500]}")
+            print(f"Raw response: {raw[:500]}")
             print(f"Cleaned content: {content[:500]}")
-            return {"characters": [], "interactions": []}
+            return None
 
     
     def _merge_results(self, results: List[Dict]) -> Dict:
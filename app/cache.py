@@ -0,0 +1,51 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from app.config import settings
+
+# cache.py
+
+
+class LRUCache:
+    """Small thread-safe in-process LRU cache."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def hash_result(result: Any) -> str:
+    """Stable content hash of a JSON-serializable result."""
+    canonical = json.dumps(result, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# Full analysis results keyed by (book_id, provider, model, backend).
+# Entries are {"result": dict, "hash": str}.
+result_cache = LRUCache(settings.RESULT_CACHE_SIZE)
+
+# Per-chapter chunk results keyed by (provider, model, backend, chunk settings, text hash).
+# Entries are {"chunk_results": [...], "chunks_analyzed": int}.
+chapter_cache = LRUCache(settings.CHAPTER_CACHE_SIZE)
@@ -0,0 +1,84 @@
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+from app.config import settings
+
+# cascade.py
+
+# Capitalized word runs ("Elizabeth", "Mr. Darcy", "Lady Catherine de Bourgh" -> "Lady Catherine")
+PROPER_NOUN = re.compile(r"\b(?:(?:Mr|Mrs|Ms|Dr|St)\.\s+)?[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*")
+# Capitalization after these tells us nothing
+SENTENCE_START = re.compile(r"(?:^|[.!?:;]\s*[\"'“‘]?\s*|\n\s*[\"'“‘]?)$")
+
+# Capitalized words that are rarely characters
+NON_NAMES = {
+    "I", "A", "An", "The", "He", "She", "It", "We", "They", "You", "His", "Her", "Its",
+    "Their", "Our", "My", "Your", "This", "That", "These", "Those", "There", "Then",
+    "But", "And", "Or", "If", "When", "What", "Who", "Why", "How", "Yes", "No", "Oh",
+    "Sir", "Madam", "Lord", "Lady", "Miss", "Mr", "Mrs", "God", "Heaven",
+    "Chapter", "Book", "Part", "Volume",
+    "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday",
+    "January", "February", "March", "April", "May", "June", "July", "August",
+    "September", "October", "November", "December",
+    "English", "England", "London", "French", "France",
+}
+
+
+def scan_proper_nouns(text: str) -> Counter:
+    """
+    Cheap local scan for likely character names: capitalized word runs that
+    don't start a sentence, with common non-name words dropped.
+    """
+    found = Counter()
+    for match in PROPER_NOUN.finditer(text):
+        if SENTENCE_START.search(text[max(0, match.start() - 4):match.start()]):
+            continue
+        words = [word for word in match.group(0).split() if word.rstrip(".") not in NON_NAMES]
+        if words:
+            found[" ".join(words)] += 1
+    return found
+
+
+def frequent_names(chunk_text: str) -> List[str]:
+    """Proper nouns seen at least CASCADE_MIN_MENTIONS times in the chunk."""
+    return [
+        name for name, count in scan_proper_nouns(chunk_text).items()
+        if count >= settings.CASCADE_MIN_MENTIONS
+    ]
+
+
+def missed_names(names: List[str], parsed: Dict) -> List[str]:
+    """Names that none of the extracted characters (or their aliases) account for."""
+    known = set()
+    for char in parsed.get("characters", []):
+        for name in [char.get("name", ""), *char.get("aliases", [])]:
+            known.update(word.lower().strip(".") for word in name.split())
+    return [
+        name for name in names
+        if not any(word.lower().strip(".") in known for word in name.split())
+    ]
+
+
+def looks_truncated(raw: str) -> bool:
+    """A JSON answer that stops before its closing brace was cut off."""
+    content = raw.strip().rstrip("`").strip()
+    if "{" not in content:
+        return False
+    return content.count("{") > content.count("}") or not content.endswith("}")
+
+
+def escalation_reason(chunk_text: str, raw: str, truncated: bool, parsed: Optional[Dict]) -> Optional[str]:
+    """
+    Why a cheap-model answer should be redone by the strong model, or None to accept it.
+    Reasons: "truncated", "parse_error", "missed_names".
+    """
+    if truncated:
+        return "truncated"
+    if parsed is None:
+        # Only guess at truncation when the answer didn't parse; a valid answer
+        # followed by prose or a code fence is fine
+        return "truncated" if looks_truncated(raw) else "parse_error"
+    names = frequent_names(chunk_text)
+    if names and len(missed_names(names, parsed)) / len(names) > settings.CASCADE_MAX_MISSED_RATIO:
+        return "missed_names"
+    return None
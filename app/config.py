@@ -33,6 +33,18 @@ class Settings(BaseSettings):
     OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "llama3.2")
     OLLAMA_API_URL: str = f"{OLLAMA_BASE_URL}/api/chat"
     OLLAMA_MODELS_URL: str = f"{OLLAMA_BASE_URL}/api/tags"
+    OLLAMA_PS_URL: str = f"{OLLAMA_BASE_URL}/api/ps"
+    OLLAMA_GENERATE_URL: str = f"{OLLAMA_BASE_URL}/api/generate"
+    
+    # Ollama tuning
+    OLLAMA_KEEP_ALIVE: str = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    OLLAMA_NUM_PARALLEL: int = int(os.getenv("OLLAMA_NUM_PARALLEL", "0"))  # 0 = detect
+    OLLAMA_NUM_CTX: int = int(os.getenv("OLLAMA_NUM_CTX", "0"))  # 0 = derive from chunk size
+    OLLAMA_WARMUP: bool = os.getenv("OLLAMA_WARMUP", "true").lower() == "true"
+    OLLAMA_WARMUP_MODELS: str = os.getenv("OLLAMA_WARMUP_MODELS", "")  # comma-separated
+    
+    # Project Gutenberg mirror (the load-test harness points this at a local fixture server)
+    GUTENBERG_BASE_URL: str = os.getenv("GUTENBERG_BASE_URL", "https://www.gutenberg.org")
     
     # Text processing
     CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "2048"))
@@ -41,6 +53,25 @@ class Settings(BaseSettings):
     # LLM parameters
     TEMPERATURE: float = float(os.getenv("TEMPERATURE", "0.1"))
     
+    # Caching
+    RESULT_CACHE_SIZE: int = int(os.getenv("RESULT_CACHE_SIZE", "32"))  # analyses kept per worker
+    CHAPTER_CACHE_SIZE: int = int(os.getenv("CHAPTER_CACHE_SIZE", "2048"))  # chapters kept per worker
+    
+    # Graph analytics
+    ANALYTICS_BETWEENNESS_SAMPLE: int = int(os.getenv("ANALYTICS_BETWEENNESS_SAMPLE", "200"))  # 0 = exact
+    
+    # Model cascade: cheap model first, strong (requested) model only for hard chunks
+    CASCADE_FAST_PROVIDER: str = os.getenv("CASCADE_FAST_PROVIDER", "groq")
+    CASCADE_FAST_MODEL: str = os.getenv("CASCADE_FAST_MODEL", "llama-3.1-8b-instant")
+    CASCADE_MIN_MENTIONS: int = int(os.getenv("CASCADE_MIN_MENTIONS", "2"))  # proper-noun scan threshold
+    CASCADE_MAX_MISSED_RATIO: float = float(os.getenv("CASCADE_MAX_MISSED_RATIO", "0.5"))
+    
+    # LLM client
+    LLM_BACKEND: Literal["llama_index", "native"] = os.getenv("LLM_BACKEND", "llama_index")
+    LLM_CONCURRENCY: int = int(os.getenv("LLM_CONCURRENCY", "1"))  # hosted providers; Ollama uses its slots
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "120"))
+    
     class Config:
         env_file = ".env"
 
@@ -1,6 +1,8 @@
 import requests
 import re
+from typing import Dict, List
 from fastapi import HTTPException
+from app.config import settings
 
 # gutenberg.py
 
@@ -9,10 +11,11 @@ def fetch_gutenberg_text(book_id: int) -> str:
     Download book text from Project Gutenberg.
     Tries multiple URL formats to find the book.
     """
+    base_url = settings.GUTENBERG_BASE_URL
     urls = [
-        f"https://www.gutenberg.org/files/{book_id}/{book_id}-0.txt",
-        f"https://www.gutenberg.org/files/{book_id}/{book_id}.txt",
-        f"https://www.gutenberg.org/cache/epub/{book_id}/pg{book_id}.txt",
+        f"{base_url}/files/{book_id}/{book_id}-0.txt",
+        f"{base_url}/files/{book_id}/{book_id}.txt",
+        f"{base_url}/cache/epub/{book_id}/pg{book_id}.txt",
     ]
     
     for url in urls:
@@ -60,4 +63,113 @@ def strip_headers(text: str) -> str:
     if start_match and end_match:
         return text[start_match.end():end_match.start()].strip()
     
-    return text.strip()
\ No newline at end of file
+    return text.strip()
+
+# Spelled-out chapter numbers ("CHAPTER ONE", "Book the First", "Part Twenty-Three")
+NUMBER_WORDS = (
+    "One|Two|Three|Four|Five|Six|Seven|Eight|Nine|Ten|Eleven|Twelve|Thirteen|Fourteen|"
+    "Fifteen|Sixteen|Seventeen|Eighteen|Nineteen|Twenty|Thirty|Forty|Fifty|Sixty|Seventy|"
+    "Eighty|Ninety|Hundred|First|Second|Third|Fourth|Fifth|Sixth|Seventh|Eighth|Ninth|"
+    "Tenth|Eleventh|Twelfth|Thirteenth|Fourteenth|Fifteenth|Sixteenth|Seventeenth|"
+    "Eighteenth|Nineteenth|Twentieth|Thirtieth|Fortieth|Fiftieth|Last"
+)
+HEADING_NUMBER = rf"(?:[IVXLCDM]+|\d+|(?:(?i:the)[ \t]+)?(?i:{NUMBER_WORDS})(?:-(?i:{NUMBER_WORDS}))?)"
+
+# Headings sit on their own line after a blank line (or open the text); hard-wrapped
+# prose that happens to start with "Part" or "Book" doesn't
+CHAPTER_HEADING = re.compile(
+    rf"(?:\A|(?<=\n\n))[ \t]*(?:CHAPTER|Chapter)[ \t]+{HEADING_NUMBER}\b[^\n]*$",
+    re.MULTILINE,
+)
+PART_HEADING = re.compile(
+    rf"(?:\A|(?<=\n\n))[ \t]*(?:BOOK|Book|PART|Part|VOLUME|Volume)[ \t]+{HEADING_NUMBER}\b[^\n]*$",
+    re.MULTILINE,
+)
+# A bare Roman numeral ("IV" or "IV.") on a line of its own between blank lines
+ROMAN_HEADING = re.compile(r"(?:\A|(?<=\n\n))[ \t]*[IVXLCDM]+\.?[ \t]*$(?=\n[ \t]*\n|\s*\Z)", re.MULTILINE)
+
+MAX_HEADING_LENGTH = 80
+# Segments shorter than this are headings only (e.g. a table of contents)
+# and get folded into the next segment
+MIN_CHAPTER_CHARS = 500
+# Upper bound for chapter selections, so "1-20000000" is rejected before it's expanded
+MAX_CHAPTER_NUMBER = 2000
+
+
+def split_chapters(text: str) -> List[Dict]:
+    """
+    Split a book into chapters using common Gutenberg headings
+    (CHAPTER I, Chapter 12, BOOK/PART/VOLUME, bare Roman numerals).
+    Returns [{"index": 1, "title": "CHAPTER I", "text": "..."}, ...].
+    Books without recognizable headings come back as a single chapter.
+    """
+    text = text.replace("\r\n", "\n")
+
+    headings = []
+    for kind, pattern in (("chapter", CHAPTER_HEADING), ("part", PART_HEADING), ("chapter", ROMAN_HEADING)):
+        for match in pattern.finditer(text):
+            title = match.group(0).strip()
+            if len(title) <= MAX_HEADING_LENGTH:
+                headings.append((match.start(), kind, title))
+    headings.sort()
+
+    if not headings:
+        return [{"index": 1, "title": "Full text", "text": text.strip()}]
+
+    segments = []
+    if text[:headings[0][0]].strip():
+        segments.append({"kind": "opening", "title": "Opening", "start": 0})
+    for start, kind, title in headings:
+        segments.append({"kind": kind, "title": title, "start": start})
+    for segment, following in zip(segments, segments[1:] + [{"start": len(text)}]):
+        segment["text"] = text[segment["start"]:following["start"]].strip()
+
+    chapters = []
+    pending_text, pending_part = "", None
+    for segment in segments:
+        body = segment["text"][len(segment["title"]):] if segment["kind"] != "opening" else segment["text"]
+        if len(body.strip()) < MIN_CHAPTER_CHARS and segment is not segments[-1]:
+            # Heading with no real content: carry it into the next segment
+            pending_text += segment["text"] + "\n\n"
+            pending_part = segment["title"] if segment["kind"] == "part" else None
+            continue
+        title = segment["title"]
+        if pending_part and segment["kind"] == "chapter":
+            title = f"{pending_part}, {title}"
+        chapters.append({
+            "index": len(chapters) + 1,
+            "title": title,
+            "text": (pending_text + segment["text"]).strip(),
+        })
+        pending_text, pending_part = "", None
+
+    return chapters
+
+
+def parse_chapter_range(spec: str) -> List[int]:
+    """
+    Parse a chapter selection like "1-5" or "1,3,7-9" into sorted chapter numbers.
+    Raises ValueError on malformed input or numbers above MAX_CHAPTER_NUMBER.
+    """
+    selected = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = (int(x) for x in part.split("-", 1))
+            if first < 1 or last < first:
+                raise ValueError(f"Invalid chapter range: {part}")
+            if last > MAX_CHAPTER_NUMBER:
+                raise ValueError(f"Chapter numbers go up to {MAX_CHAPTER_NUMBER}: {part}")
+            selected.update(range(first, last + 1))
+        else:
+            number = int(part)
+            if number < 1:
+                raise ValueError(f"Invalid chapter number: {part}")
+            if number > MAX_CHAPTER_NUMBER:
+                raise ValueError(f"Chapter numbers go up to {MAX_CHAPTER_NUMBER}: {part}")
+            selected.add(number)
+    if not selected:
+        raise ValueError("Empty chapter selection")
+    return sorted(selected)
@@ -1,26 +1,20 @@
-import json
+import httpx
 import requests
-from typing import Dict, List
+from typing import Dict, List, Optional
 from app.config import settings
+from app.ollama_tuning import get_num_ctx
 
 # llm.py
 
-PROMPT_TEMPLATE = """
-You are a literary analyst. Analyze the following text and extract characters and their interactions.
+SYSTEM_PROMPT = "You are a helpful text analysis assistant."
 
-Return the output strictly as JSON in the following format:
-{{
-  "characters": [
-    {{
-      "name": "Romeo",
-      "interactions": {{"Juliet": 23, "Mercutio": 12}}
-    }}
-  ]
-}}
+# OpenAI models with structured outputs (json_schema); older ones such as
+# gpt-4-turbo and gpt-3.5-turbo only accept json_object
+OPENAI_STRUCTURED_OUTPUT_PREFIXES = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+OPENAI_NO_STRUCTURED_OUTPUTS = {"gpt-4o-2024-05-13", "o1-preview", "o1-mini"}
 
-Text:
-{chunk}
-"""
+# Shared across requests so connections (and TLS sessions) are reused
+_client: Optional[httpx.AsyncClient] = None
 
 
 def get_available_models(provider: str) -> List[Dict[str, str]]:
@@ -96,137 +90,194 @@ def _get_ollama_models() -> List[Dict[str, str]]:
         return [{"id": settings.OLLAMA_MODEL, "name": settings.OLLAMA_MODEL}]
 
 
-def analyze_chunk_with_llm(chunk: str, provider: str = None, model: str = None) -> dict:
-    """Send a text chunk to LLM and return parsed JSON dict."""
+def get_client() -> httpx.AsyncClient:
+    """Return the pooled HTTP client used for all provider calls."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.LLM_TIMEOUT, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+            ),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the pooled HTTP client (called on app shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def complete(prompt: str, provider: str = None, model: str = None, json_schema: Dict = None) -> Dict:
+    """
+    Send a prompt to a provider using its native JSON / structured-output mode.
+
+    Returns a dict with:
+    - content: raw text of the answer (expected to be JSON)
+    - usage: {"prompt_tokens": int, "completion_tokens": int}
+    - truncated: True if the model stopped because it hit its token limit
+    """
     if provider is None:
         provider = settings.PROVIDER.lower()
 
     if provider == "openai":
-        return _call_openai(chunk, model)
+        model = model or settings.OPENAI_MODEL
+        return await _call_openai_compatible(
+            settings.OPENAI_API_URL, settings.OPENAI_API_KEY, model,
+            prompt, _openai_response_format(model, json_schema),
+        )
     elif provider == "groq":
-        return _call_groq(chunk, model)
+        # Groq only guarantees json_object across its models
+        return await _call_openai_compatible(
+            settings.GROQ_API_URL, settings.GROQ_API_KEY, model or settings.GROQ_MODEL,
+            prompt, {"type": "json_object"},
+        )
     elif provider == "sambanova":
-        return _call_sambanova(chunk, model)
+        # Not every SambaNova model supports response_format; rely on the prompt
+        return await _call_openai_compatible(
+            settings.SAMBANOVA_API_URL, settings.SAMBANOVA_API_KEY, model or settings.SAMBANOVA_MODEL,
+            prompt, None,
+        )
     elif provider == "gemini":
-        return _call_gemini(chunk, model)
+        return await _call_gemini(prompt, model, json_schema)
     elif provider == "ollama":
-        return _call_ollama(chunk, model)
+        return await _call_ollama(prompt, model, json_schema)
     else:
         raise ValueError(f"Unsupported provider: {provider}")
 
 
-def _call_openai(chunk: str, model: str = None) -> dict:
-    """Call OpenAI API."""
-    prompt = PROMPT_TEMPLATE.format(chunk=chunk)
-    headers = {
-        "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-    body = {
-        "model": model or settings.OPENAI_MODEL,
-        "messages": [
-            {"role": "system", "content": "You are a helpful text analysis assistant."},
-            {"role": "user", "content": prompt},
-        ],
-        "temperature": settings.TEMPERATURE,
-        "response_format": {"type": "json_object"},
-    }
-    resp = requests.post(settings.OPENAI_API_URL, headers=headers, json=body, timeout=60)
-    resp.raise_for_status()
-    content = resp.json()["choices"][0]["message"]["content"]
-    return json.loads(content)
+def _supports_structured_outputs(model: str) -> bool:
+    """Whether an OpenAI model accepts response_format json_schema."""
+    base = model.removeprefix("ft:")
+    if base in OPENAI_NO_STRUCTURED_OUTPUTS:
+        return False
+    return base.startswith(OPENAI_STRUCTURED_OUTPUT_PREFIXES)
 
 
-def _call_groq(chunk: str, model: str = None) -> dict:
-    """Call Groq API (OpenAI-compatible)."""
-    prompt = PROMPT_TEMPLATE.format(chunk=chunk)
-    headers = {
-        "Authorization": f"Bearer {settings.GROQ_API_KEY}",
-        "Content-Type": "application/json",
+def _openai_response_format(model: str, json_schema: Dict = None) -> Dict:
+    """Strict structured outputs when a schema is given and the model supports them, plain JSON mode otherwise."""
+    if json_schema is None or not _supports_structured_outputs(model):
+        return {"type": "json_object"}
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": "analysis", "schema": json_schema, "strict": True},
     }
-    body = {
-        "model": model or settings.GROQ_MODEL,
-        "messages": [
-            {"role": "system", "content": "You are a helpful text analysis assistant."},
-            {"role": "user", "content": prompt},
-        ],
-        "temperature": settings.TEMPERATURE,
-        "response_format": {"type": "json_object"},
-    }
-    resp = requests.post(settings.GROQ_API_URL, headers=headers, json=body, timeout=60)
-    resp.raise_for_status()
-    content = resp.json()["choices"][0]["message"]["content"]
-    return json.loads(content)
 
 
-def _call_sambanova(chunk: str, model: str = None) -> dict:
-    """Call SambaNova Cloud API."""
-    prompt = PROMPT_TEMPLATE.format(chunk=chunk)
+def _gemini_schema(schema: Dict) -> Dict:
+    """Convert a JSON schema to Gemini's OpenAPI subset (upper-case types, no additionalProperties)."""
+    converted = {}
+    for key, value in schema.items():
+        if key == "additionalProperties":
+            continue
+        if key == "type":
+            converted[key] = value.upper()
+        elif key == "properties":
+            converted[key] = {name: _gemini_schema(prop) for name, prop in value.items()}
+        elif key == "items":
+            converted[key] = _gemini_schema(value)
+        else:
+            converted[key] = value
+    return converted
+
+
+async def _call_openai_compatible(url: str, api_key: str, model: str, prompt: str, response_format: Optional[Dict]) -> Dict:
+    """Call an OpenAI-compatible chat completions API (OpenAI, Groq, SambaNova)."""
     headers = {
-        "Authorization": f"Bearer {settings.SAMBANOVA_API_KEY}",
+        "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
     }
     body = {
-        "model": model or settings.SAMBANOVA_MODEL,
+        "model": model,
         "messages": [
-            {"role": "system", "content": "You are a helpful text analysis assistant."},
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": prompt},
         ],
         "temperature": settings.TEMPERATURE,
     }
-    resp = requests.post(settings.SAMBANOVA_API_URL, headers=headers, json=body, timeout=60)
+    if response_format is not None:
+        body["response_format"] = response_format
+
+    resp = await get_client().post(url, headers=headers, json=body)
     resp.raise_for_status()
-    content = resp.json()["choices"][0]["message"]["content"]
-    
-    # Clean up response if needed
-    if "```json" in content:
-        start = content.find("```json") + 7
-        end = content.find("```", start)
-        content = content[start:end].strip()
-    
-    return json.loads(content)
-
-
-def _call_gemini(chunk: str, model: str = None) -> dict:
+
+    data = resp.json()
+    choice = data["choices"][0]
+    usage = data.get("usage") or {}
+    return {
+        "content": choice["message"]["content"] or "",
+        "usage": {
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+        },
+        "truncated": choice.get("finish_reason") == "length",
+    }
+
+
+async def _call_gemini(prompt: str, model: str = None, json_schema: Dict = None) -> Dict:
     """Call Google Gemini API."""
     model_name = model or settings.GEMINI_MODEL
-    url = f"{settings.GEMINI_API_URL}/{model_name}:generateContent?key={settings.GEMINI_API_KEY}"
-    
-    prompt = PROMPT_TEMPLATE.format(chunk=chunk)
+    url = f"{settings.GEMINI_API_URL}/{model_name}:generateContent"
+
+    generation_config = {
+        "temperature": settings.TEMPERATURE,
+        "responseMimeType": "application/json",
+    }
+    if json_schema is not None:
+        generation_config["responseSchema"] = _gemini_schema(json_schema)
     body = {
         "contents": [{
             "parts": [{"text": prompt}]
         }],
-        "generationConfig": {
-            "temperature": settings.TEMPERATURE,
-            "responseMimeType": "application/json"
-        }
+        "generationConfig": generation_config,
     }
-    
-    resp = requests.post(url, json=body, timeout=60)
+
+    resp = await get_client().post(url, params={"key": settings.GEMINI_API_KEY}, json=body)
     resp.raise_for_status()
-    
+
     data = resp.json()
-    content = data["candidates"][0]["content"]["parts"][0]["text"]
-    return json.loads(content)
+    candidate = data["candidates"][0]
+    usage = data.get("usageMetadata") or {}
+    return {
+        "content": "".join(part.get("text", "") for part in candidate["content"]["parts"]),
+        "usage": {
+            "prompt_tokens": usage.get("promptTokenCount", 0),
+            "completion_tokens": usage.get("candidatesTokenCount", 0),
+        },
+        "truncated": candidate.get("finishReason") == "MAX_TOKENS",
+    }
 
 
-def _call_ollama(chunk: str, model: str = None) -> dict:
-    """Call local Ollama server."""
-    prompt = PROMPT_TEMPLATE.format(chunk=chunk)
+async def _call_ollama(prompt: str, model: str = None, json_schema: Dict = None) -> Dict:
+    """Call local Ollama server. A schema in `format` enables structured outputs."""
     body = {
         "model": model or settings.OLLAMA_MODEL,
         "messages": [
-            {"role": "system", "content": "You are a helpful text analysis assistant."},
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": prompt},
         ],
         "stream": False,
-        "format": "json"
+        "format": json_schema if json_schema is not None else "json",
+        "keep_alive": settings.OLLAMA_KEEP_ALIVE,
+        "options": {
+            "num_ctx": get_num_ctx(),
+            "temperature": settings.TEMPERATURE,
+        },
     }
 
-    resp = requests.post(settings.OLLAMA_API_URL, json=body, timeout=120)
+    resp = await get_client().post(settings.OLLAMA_API_URL, json=body)
     resp.raise_for_status()
 
     data = resp.json()
-    content = data["message"]["content"]
-    return json.loads(content)
\ No newline at end of file
+    return {
+        "content": data["message"]["content"],
+        "usage": {
+            "prompt_tokens": data.get("prompt_eval_count", 0),
+            "completion_tokens": data.get("eval_count", 0),
+        },
+        "truncated": data.get("done_reason") == "length",
+    }
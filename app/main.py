@@ -1,12 +1,26 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.routes import router
+from app.config import settings
+from app.llm import close_client
+from app.ollama_tuning import get_warmup_models, warm_up_models
 from fastapi.middleware.cors import CORSMiddleware
 # main.py
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Preload Ollama models in the background so the first chunk doesn't pay the load
+    if settings.OLLAMA_WARMUP and get_warmup_models():
+        app.state.ollama_warmup = asyncio.get_running_loop().run_in_executor(None, warm_up_models)
+    yield
+    await close_client()
+
 app = FastAPI(
     title="Gutenberg Character Analyzer API",
     description="Analyze Project Gutenberg books for characters and relationships using LlamaIndex",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -15,6 +29,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 app.include_router(router, prefix="/api")
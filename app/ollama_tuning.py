@@ -0,0 +1,122 @@
+import requests
+from typing import Dict, List
+from app.config import settings
+
+# ollama_tuning.py
+
+# Rough token budget around each chunk: prompt instructions + JSON answer
+PROMPT_OVERHEAD_TOKENS = 512
+RESPONSE_BUDGET_TOKENS = 1024
+
+# Ollama's own default when OLLAMA_NUM_PARALLEL is unset on the server:
+# 4 slots if the model fits entirely in VRAM, otherwise 1
+AUTO_PARALLEL_GPU = 4
+AUTO_PARALLEL_CPU = 1
+
+
+def _normalize(name: str) -> str:
+    """Ollama reports untagged models as 'name:latest'."""
+    return name if ":" in name else f"{name}:latest"
+
+
+def get_running_models() -> List[Dict]:
+    """Return the models currently loaded by the Ollama server (/api/ps)."""
+    try:
+        resp = requests.get(settings.OLLAMA_PS_URL, timeout=5)
+        resp.raise_for_status()
+        return resp.json().get("models", [])
+    except requests.RequestException as e:
+        print(f"Cannot read running Ollama models: {e}")
+        return []
+
+
+def get_installed_models() -> List[str]:
+    """Return the names of the models installed on the Ollama server (/api/tags)."""
+    try:
+        resp = requests.get(settings.OLLAMA_MODELS_URL, timeout=5)
+        resp.raise_for_status()
+        return [m.get("name", "") for m in resp.json().get("models", [])]
+    except requests.RequestException as e:
+        print(f"Cannot read installed Ollama models: {e}")
+        return []
+
+
+def get_num_ctx() -> int:
+    """
+    Context window to request from Ollama.
+    Sized to fit one chunk plus prompt and answer, rounded up to 1024 tokens,
+    so every request reuses the same loaded model instead of forcing a reload.
+    """
+    if settings.OLLAMA_NUM_CTX > 0:
+        return settings.OLLAMA_NUM_CTX
+    needed = settings.CHUNK_SIZE + PROMPT_OVERHEAD_TOKENS + RESPONSE_BUDGET_TOKENS
+    return -(-needed // 1024) * 1024
+
+
+def get_parallel_slots(model: str = None) -> int:
+    """
+    Number of requests the Ollama server can serve at once for a model.
+
+    The server does not expose OLLAMA_NUM_PARALLEL over the API, so an explicit
+    setting wins; otherwise we mirror Ollama's auto default using /api/ps
+    (fully GPU-resident models get several slots, CPU/split models get one).
+    """
+    if settings.OLLAMA_NUM_PARALLEL > 0:
+        return settings.OLLAMA_NUM_PARALLEL
+
+    target = _normalize(model or settings.OLLAMA_MODEL)
+    for running in get_running_models():
+        if _normalize(running.get("name", "")) != target:
+            continue
+        size = running.get("size", 0)
+        size_vram = running.get("size_vram", 0)
+        if size and size_vram >= size:
+            return AUTO_PARALLEL_GPU
+        return AUTO_PARALLEL_CPU
+
+    return AUTO_PARALLEL_CPU
+
+
+def get_warmup_models() -> List[str]:
+    """Models to preload at startup."""
+    if settings.OLLAMA_WARMUP_MODELS:
+        return [m.strip() for m in settings.OLLAMA_WARMUP_MODELS.split(",") if m.strip()]
+    if settings.PROVIDER == "ollama":
+        return [settings.OLLAMA_MODEL]
+    return []
+
+
+def warm_up_models(models: List[str] = None) -> Dict[str, bool]:
+    """
+    Load models into memory and pin them with keep_alive.
+    An empty prompt makes Ollama load the model without generating anything.
+    """
+    models = models if models is not None else get_warmup_models()
+    if not models:
+        return {}
+
+    installed = {_normalize(name) for name in get_installed_models()}
+    status = {}
+    for model in models:
+        if installed and _normalize(model) not in installed:
+            print(f"Skipping warm-up for {model}: not installed (ollama pull {model})")
+            status[model] = False
+            continue
+        try:
+            resp = requests.post(
+                settings.OLLAMA_GENERATE_URL,
+                json={
+                    "model": model,
+                    "prompt": "",
+                    "keep_alive": settings.OLLAMA_KEEP_ALIVE,
+                    "options": {"num_ctx": get_num_ctx()},
+                },
+                timeout=300,
+            )
+            resp.raise_for_status()
+            status[model] = True
+            print(f"Warmed up Ollama model {model} (keep_alive={settings.OLLAMA_KEEP_ALIVE})")
+        except requests.RequestException as e:
+            print(f"Warm-up failed for {model}: {e}")
+            status[model] = False
+    return status
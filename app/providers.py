@@ -0,0 +1,27 @@
+import importlib
+from typing import Dict, Tuple, Type
+from llama_index.core.llms import LLM
+
+# providers.py
+
+# provider -> (module, class). Integrations are imported on first use so a
+# process only pays for the SDKs of the providers it actually talks to.
+LLM_CLASSES: Dict[str, Tuple[str, str]] = {
+    "openai": ("llama_index.llms.openai", "OpenAI"),
+    "sambanova": ("llama_index.llms.openai", "OpenAI"),  # OpenAI-compatible API
+    "groq": ("llama_index.llms.groq", "Groq"),
+    "gemini": ("llama_index.llms.gemini", "Gemini"),
+    "ollama": ("llama_index.llms.ollama", "Ollama"),
+}
+
+_loaded: Dict[str, Type[LLM]] = {}
+
+
+def get_llm_class(provider: str) -> Type[LLM]:
+    """Return the llama_index LLM class for a provider, importing it on first use."""
+    if provider not in _loaded:
+        if provider not in LLM_CLASSES:
+            raise ValueError(f"Unsupported provider: {provider}")
+        module_name, class_name = LLM_CLASSES[provider]
+        _loaded[provider] = getattr(importlib.import_module(module_name), class_name)
+    return _loaded[provider]
@@ -0,0 +1,121 @@
+import gzip
+import hashlib
+import json
+import brotli
+import msgpack
+from typing import Dict, Optional
+from fastapi import Request, Response
+
+# responses.py
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+# Below this size compression costs more than it saves
+MIN_COMPRESS_SIZE = 1024
+BROTLI_QUALITY = 5  # good ratio at a speed suitable for dynamic responses
+GZIP_LEVEL = 6
+
+
+def negotiate_format(request: Request, fmt: Optional[str]) -> str:
+    """Pick json or msgpack from the `format=` parameter, falling back to the Accept header."""
+    if fmt:
+        return fmt
+    accept = request.headers.get("accept", "")
+    if any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES):
+        return "msgpack"
+    return "json"
+
+
+def negotiate_encoding(request: Request) -> Optional[str]:
+    """
+    Pick br or gzip from Accept-Encoding by q-value, or None for an uncompressed body.
+    Codings with q=0 are refused; `*` covers codings that aren't listed. An identity
+    body is sent when nothing else is acceptable, even if identity;q=0 (no 406).
+    """
+    weights = {}
+    for entry in request.headers.get("accept-encoding", "").split(","):
+        coding, *params = [part.strip() for part in entry.split(";")]
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.lower()] = weight
+
+    # Highest q wins; br beats gzip on a tie
+    default = weights.get("*", 0.0)
+    best = max(("br", "gzip"), key=lambda coding: weights.get(coding, default))
+    return best if weights.get(best, default) > 0 else None
+
+
+def make_etag(result_hash: str, variant: Dict) -> str:
+    """
+    Strong ETag for one representation (shaping + format) of a cached result.
+    render() suffixes it with the content coding, since br, gzip and identity
+    bodies differ byte for byte.
+    """
+    key = result_hash + json.dumps(variant, sort_keys=True)
+    return '"' + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def _with_coding(etag: str, coding: Optional[str]) -> str:
+    return etag[:-1] + "-" + coding + '"' if coding else etag
+
+
+def _strip_coding(etag: str) -> str:
+    for coding in ("br", "gzip"):
+        if etag.endswith("-" + coding + '"'):
+            return etag[:-len(coding) - 2] + '"'
+    return etag
+
+
+def matching_etag(request: Request, etag: str) -> Optional[str]:
+    """
+    The If-None-Match tag naming this representation in any content coding,
+    or None. The returned tag (with its coding suffix) goes back in the 304.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    if header.strip() == "*":
+        return etag
+    # If-None-Match uses weak comparison, so ignore any W/ prefix
+    for tag in header.split(","):
+        tag = tag.strip().removeprefix("W/")
+        if _strip_coding(tag) == etag:
+            return tag
+    return None
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept, Accept-Encoding"})
+
+
+def render(request: Request, payload: Dict, fmt: str, etag: str) -> Response:
+    """
+    Serialize a payload as JSON or msgpack, compress it with brotli or gzip when
+    the client accepts it, and tag it with the ETag for that content coding.
+    """
+    if fmt == "msgpack":
+        body = msgpack.packb(payload, use_bin_type=True)
+        media_type = "application/msgpack"
+    else:
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        media_type = "application/json"
+
+    coding = negotiate_encoding(request) if len(body) >= MIN_COMPRESS_SIZE else None
+    if coding == "br":
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    elif coding == "gzip":
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+    headers = {"ETag": _with_coding(etag, coding), "Vary": "Accept, Accept-Encoding"}
+    if coding:
+        headers["Content-Encoding"] = coding
+
+    return Response(content=body, media_type=media_type, headers=headers)
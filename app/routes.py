@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Query, HTTPException
+from typing import Dict, Literal
+from fastapi import APIRouter, Query, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from app.config import settings
-from app.gutenberg import fetch_gutenberg_text, strip_headers
+from app.cache import hash_result, result_cache
+from app.gutenberg import fetch_gutenberg_text, parse_chapter_range, strip_headers
 from app.analyzer import BookAnalyzer
 from app.llm import get_available_models
+from app.responses import make_etag, matching_etag, negotiate_format, not_modified, render
+from app.shaping import parse_fields, shape_graph
 
 # routes.py
 
@@ -87,48 +92,198 @@ def list_models(
             detail=f"Failed to fetch models for {provider}: {str(e)}"
         )
 
+async def _get_analysis(
+    book_id: int, provider: str, model: str, backend: str, chapters: str = None, cascade: bool = False,
+    refresh: bool = False,
+) -> Dict:
+    """
+    Return the cached analysis entry ({"result", "hash"}) for a book, running the analysis on a miss.
+    Raises HTTPException for invalid parameters.
+    """
+    # Determine provider
+    chosen_provider = provider.lower() if provider else settings.PROVIDER
+    
+    valid_providers = ["openai", "groq", "sambanova", "gemini", "ollama"]
+    if chosen_provider not in valid_providers:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid provider: {chosen_provider}. Must be one of: {', '.join(valid_providers)}"
+        )
+    
+    chosen_backend = backend.lower() if backend else settings.LLM_BACKEND
+    if chosen_backend not in ("llama_index", "native"):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid backend: {chosen_backend}. Must be one of: llama_index, native"
+        )
+    
+    chapter_numbers = None
+    if chapters:
+        try:
+            chapter_numbers = parse_chapter_range(chapters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid chapters: {chapters} ({e})")
+    
+    cache_key = (book_id, chosen_provider, model, chosen_backend, tuple(chapter_numbers or ()), cascade)
+    entry = None if refresh else result_cache.get(cache_key)
+    if entry is not None:
+        return entry
+    
+    # Fetch and clean book text
+    raw_text = await run_in_threadpool(fetch_gutenberg_text, book_id)
+    clean_text = strip_headers(raw_text)
+    
+    # Initialize analyzer (may probe Ollama, so off the event loop) and process
+    analyzer = await run_in_threadpool(
+        BookAnalyzer, provider=chosen_provider, model=model, backend=chosen_backend, cascade=cascade
+    )
+    try:
+        result = await analyzer.analyze(clean_text, chapters=chapter_numbers, refresh=refresh)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Add metadata
+    result["book_id"] = book_id
+    result["provider"] = chosen_provider
+    result["model"] = model or f"default ({chosen_provider})"
+    result["backend"] = chosen_backend
+    result["text_length"] = len(clean_text)
+    
+    entry = {"result": result, "hash": hash_result(result)}
+    result_cache.set(cache_key, entry)
+    return entry
+
+async def _with_analytics(entry: Dict) -> Dict:
+    """The cached result with graph metrics on each node; metrics are computed once and stored with it."""
+    # app.analytics pulls in networkx/numpy/scipy, so it's only imported when first needed
+    from app.analytics import attach_analytics, compute_analytics
+    if "analytics" not in entry:
+        entry["analytics"] = await run_in_threadpool(compute_analytics, entry["result"])
+    return attach_analytics(entry["result"], entry["analytics"])
+
 @router.get("/analyze")
-def analyze(
+async def analyze(
+    request: Request,
     book_id: int = Query(..., description="Project Gutenberg book ID", example=1342),
     provider: str = Query(None, description="LLM provider: openai, groq, sambanova, gemini, or ollama"),
     model: str = Query(None, description="Specific model to use (optional, uses provider default if not specified)"),
+    backend: str = Query(None, description="LLM client: llama_index or native (optional, uses LLM_BACKEND if not specified)"),
+    chapters: str = Query(None, description="Chapters to analyze, e.g. 1-5 or 1,3,7-9 (default: whole book)"),
+    cascade: bool = Query(False, description="Use the cheap CASCADE_FAST_* model first; escalate hard chunks to provider/model"),
+    min_weight: int = Query(None, ge=0, description="Drop edges with a lower weight"),
+    top_k_nodes: int = Query(None, ge=1, description="Keep only the N most mentioned characters"),
+    include_quotes: bool = Query(True, description="Include sample_quotes on nodes and edges"),
+    fields: str = Query(None, description="Comma-separated node/edge attributes to return, e.g. mention_count,weight"),
+    timeline: bool = Query(True, description="Include the per-chapter graph timeline"),
+    format: Literal["json", "msgpack"] = Query(None, description="Response format (defaults to the Accept header, then json)"),
+    analytics: bool = Query(False, description="Add degree, betweenness, PageRank and community to each node"),
+    refresh: bool = Query(False, description="Ignore the cached result and analyze again"),
 ):
     """
     Analyze a Project Gutenberg book to extract characters and their relationships.
     
+    The book is split into chapters; the response holds the aggregate graph plus a
+    `timeline` with one graph per chapter. Chapters are cached individually, so a
+    chapter selection only analyzes chapters not seen before.
+    
+    Results are cached per book/provider/model/backend/chapters and served with a strong
+    ETag, so clients can revalidate with If-None-Match and get a 304.
+    
     Examples:
     - /api/analyze?book_id=1342 (Pride and Prejudice with default provider)
     - /api/analyze?book_id=1342&provider=groq&model=llama-3.3-70b-versatile
     - /api/analyze?book_id=84&provider=ollama&model=llama3.2
+    - /api/analyze?book_id=1342&provider=openai&backend=native
+    - /api/analyze?book_id=1342&top_k_nodes=30&min_weight=2&include_quotes=false
+    - /api/analyze?book_id=1342&fields=mention_count,weight&format=msgpack
+    - /api/analyze?book_id=1342&analytics=true
+    - /api/analyze?book_id=1342&chapters=1-5
+    - /api/analyze?book_id=1342&provider=openai&model=gpt-4o&cascade=true
     """
     try:
-        # Fetch and clean book text
-        raw_text = fetch_gutenberg_text(book_id)
-        clean_text = strip_headers(raw_text)
+        entry = await _get_analysis(book_id, provider, model, backend, chapters, cascade, refresh)
+        
+        field_list = parse_fields(fields)
+        fmt = negotiate_format(request, format)
+        etag = make_etag(entry["hash"], {
+            "min_weight": min_weight,
+            "top_k_nodes": top_k_nodes,
+            "include_quotes": include_quotes,
+            "fields": field_list,
+            "timeline": timeline,
+            "format": fmt,
+            "analytics": analytics,
+        })
+        matched = matching_etag(request, etag)
+        if matched:
+            return not_modified(matched)
+        
+        result = await _with_analytics(entry) if analytics else entry["result"]
+        
+        payload = shape_graph(
+            result,
+            min_weight=min_weight,
+            top_k_nodes=top_k_nodes,
+            include_quotes=include_quotes,
+            fields=field_list,
+            include_timeline=timeline,
+        )
+        return render(request, payload, fmt, etag)
         
-        # Determine provider
-        chosen_provider = provider.lower() if provider else settings.PROVIDER
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+@router.get("/analyze/{book_id}/subgraph")
+async def analyze_subgraph(
+    request: Request,
+    book_id: int,
+    character: str = Query(..., description="Character name or alias at the center of the ego network"),
+    radius: int = Query(1, ge=1, le=3, description="How many interaction hops to include"),
+    provider: str = Query(None, description="LLM provider: openai, groq, sambanova, gemini, or ollama"),
+    model: str = Query(None, description="Specific model to use (optional, uses provider default if not specified)"),
+    backend: str = Query(None, description="LLM client: llama_index or native (optional, uses LLM_BACKEND if not specified)"),
+    include_quotes: bool = Query(True, description="Include sample_quotes on nodes and edges"),
+    analytics: bool = Query(False, description="Add whole-graph metrics to each node"),
+    format: Literal["json", "msgpack"] = Query(None, description="Response format (defaults to the Accept header, then json)"),
+):
+    """
+    Ego network of one character: the character, everyone within `radius` hops, and the edges between them.
+    Uses the cached analysis for the book (analyzing it first if needed).
+    
+    Examples:
+    - /api/analyze/1342/subgraph?character=Elizabeth%20Bennet
+    - /api/analyze/1342/subgraph?character=Lizzy&radius=2&analytics=true
+    """
+    from app.analytics import ego_subgraph, find_node
+    
+    try:
+        entry = await _get_analysis(book_id, provider, model, backend)
         
-        valid_providers = ["openai", "groq", "sambanova", "gemini", "ollama"]
-        if chosen_provider not in valid_providers:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid provider: {chosen_provider}. Must be one of: {', '.join(valid_providers)}"
-            )
+        center = find_node(entry["result"], character)
+        if center is None:
+            raise HTTPException(status_code=404, detail=f"Character not found in book {book_id}: {character}")
         
-        # Initialize analyzer and process
-        analyzer = BookAnalyzer(provider=chosen_provider, model=model)
-        result = analyzer.analyze(clean_text)
+        fmt = negotiate_format(request, format)
+        etag = make_etag(entry["hash"], {
+            "subgraph": center,
+            "radius": radius,
+            "include_quotes": include_quotes,
+            "analytics": analytics,
+            "format": fmt,
+        })
+        matched = matching_etag(request, etag)
+        if matched:
+            return not_modified(matched)
         
-        # Add metadata
-        result["book_id"] = book_id
-        result["provider"] = chosen_provider
-        result["model"] = model or f"default ({chosen_provider})"
-        result["text_length"] = len(clean_text)
+        result = await _with_analytics(entry) if analytics else entry["result"]
         
-        return result
+        subgraph = await run_in_threadpool(ego_subgraph, result, center, radius)
+        payload = shape_graph(subgraph, include_quotes=include_quotes, include_timeline=False)
+        return render(request, payload, fmt, etag)
         
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Subgraph failed: {str(e)}")
\ No newline at end of file
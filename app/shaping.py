@@ -0,0 +1,71 @@
+from typing import Dict, List, Optional
+
+# shaping.py
+
+# Keys that identify a node/edge and are always returned, whatever `fields` says
+NODE_KEYS = ("id",)
+EDGE_KEYS = ("source", "target")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated `fields=` query value."""
+    if not fields:
+        return None
+    return [f.strip() for f in fields.split(",") if f.strip()]
+
+
+def shape_graph(
+    result: Dict,
+    min_weight: Optional[int] = None,
+    top_k_nodes: Optional[int] = None,
+    include_quotes: bool = True,
+    fields: Optional[List[str]] = None,
+    include_timeline: bool = True,
+) -> Dict:
+    """
+    Return a trimmed copy of an analysis result. The input is never modified.
+
+    - min_weight: drop edges lighter than this
+    - top_k_nodes: keep the most mentioned characters and the edges between them
+    - include_quotes: drop `sample_quotes` from nodes and edges when False
+    - fields: node/edge attributes to keep (ids and edge endpoints are always kept)
+    - include_timeline: keep the per-chapter graphs (shaped the same way) when present
+    """
+    nodes = result.get("nodes", [])
+    edges = result.get("edges", [])
+
+    if top_k_nodes is not None:
+        nodes = sorted(nodes, key=lambda n: n.get("mention_count", 0), reverse=True)[:top_k_nodes]
+        kept = {n["id"] for n in nodes}
+        edges = [e for e in edges if e["source"] in kept and e["target"] in kept]
+
+    if min_weight is not None:
+        edges = [e for e in edges if e.get("weight", 0) >= min_weight]
+
+    shaped = dict(result)
+    shaped["nodes"] = [_project(n, NODE_KEYS, include_quotes, fields) for n in nodes]
+    shaped["edges"] = [_project(e, EDGE_KEYS, include_quotes, fields) for e in edges]
+    shaped["character_count"] = len(shaped["nodes"])
+    shaped["interaction_count"] = len(shaped["edges"])
+
+    if "timeline" in shaped:
+        if include_timeline:
+            shaped["timeline"] = [
+                shape_graph(chapter, min_weight, top_k_nodes, include_quotes, fields)
+                for chapter in shaped["timeline"]
+            ]
+        else:
+            del shaped["timeline"]
+    return shaped
+
+
+def _project(item: Dict, required: tuple, include_quotes: bool, fields: Optional[List[str]]) -> Dict:
+    """Copy a node/edge keeping only the requested attributes."""
+    projected = {}
+    for key, value in item.items():
+        if key == "sample_quotes" and not include_quotes:
+            continue
+        if fields is not None and key not in fields and key not in required:
+            continue
+        projected[key] = value
+    return projected
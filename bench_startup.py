@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold-start import time of the API (`import app.main`).
+Each run uses a fresh interpreter, like a dyno boot or a worker fork.
+
+Usage:
+  python bench_startup.py                 # 5 runs, print summary
+  python bench_startup.py --runs 10 --record bench_startup.jsonl
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+PROVIDER_MODULES = (
+    "llama_index.llms.openai",
+    "llama_index.llms.groq",
+    "llama_index.llms.gemini",
+    "llama_index.llms.ollama",
+)
+
+
+def run_once():
+    """Import app.main in a fresh interpreter. Returns (wall seconds, importtime stderr)."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return elapsed, proc.stderr
+
+
+def parse_importtime(stderr, root="app.main"):
+    """
+    Parse `-X importtime` output.
+    Returns ({module: cumulative microseconds}, import tree under `root`),
+    where the tree maps each module to the list of modules it imported directly.
+    """
+    cumulative = {}
+    tree = {}
+    # A module's imports are printed before the module itself, so collect
+    # finished modules per nesting level until their parent line arrives
+    pending = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            us = int(parts[1])
+        except ValueError:
+            continue  # header line
+        name = parts[2].strip()
+        cumulative[name] = us
+        # Nested imports are indented two spaces per level
+        level = (len(parts[2]) - len(parts[2].lstrip(" ")) - 1) // 2
+        tree[name] = pending.pop(level + 1, [])
+        pending.setdefault(level, []).append(name)
+    return cumulative, tree
+
+
+def print_tree(cumulative, tree, name, top, depth, indent=1):
+    """Print the slowest imports under `name`, `depth` levels deep."""
+    children = sorted(tree.get(name, []), key=lambda child: cumulative[child], reverse=True)[:top]
+    for child in children:
+        print(f"  {cumulative[child] / 1000:8.1f} ms  {'  ' * (indent - 1)}{child}")
+        if depth > 1:
+            print_tree(cumulative, tree, child, top, depth - 1, indent + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports to show per module")
+    parser.add_argument("--depth", type=int, default=2, help="Levels of the import tree under app.main to show")
+    parser.add_argument("--record", help="Append the result as a JSON line to this file")
+    args = parser.parse_args()
+
+    timings = []
+    cumulative, tree = {}, {}
+    for _ in range(args.runs):
+        elapsed, stderr = run_once()
+        timings.append(elapsed)
+        cumulative, tree = parse_importtime(stderr)
+
+    median = statistics.median(timings)
+    print(f"import app.main: median {median * 1000:.0f} ms over {args.runs} runs "
+          f"(min {min(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms)")
+
+    print("\nSlowest imports under app.main, cumulative (last run):")
+    print_tree(cumulative, tree, "app.main", args.top, args.depth)
+
+    eager = [m for m in PROVIDER_MODULES if m in cumulative]
+    print("\nProvider integrations imported at startup:", ", ".join(eager) or "none")
+
+    if args.record:
+        record = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "runs": args.runs,
+            "median_ms": round(median * 1000, 1),
+            "min_ms": round(min(timings) * 1000, 1),
+            "max_ms": round(max(timings) * 1000, 1),
+            "eager_provider_modules": eager,
+            "app_main_imports_ms": {name: round(cumulative[name] / 1000, 1) for name in tree.get("app.main", [])},
+        }
+        with open(args.record, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"\nRecorded to {args.record}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Replay a JSONL request log against the API and report throughput, latency
+percentiles, error rates and peak RSS.
+
+By default the harness starts three local processes: a mock LLM server
+(loadtest.mock_llm), a fixture Gutenberg server (loadtest.fixture_gutenberg),
+and the API itself (app.main) configured to use both. No API keys or network
+access are needed.
+
+Each log line is one request, in the style of requests.jsonl:
+  {"request_id": "lt-001", "title": "Analyze Pride and Prejudice",
+   "method": "GET", "path": "/api/analyze", "params": {"book_id": 1342}, "at": 0.0}
+"at" (seconds from start) is optional and is used when no --rate is given.
+
+Usage:
+  python -m loadtest --log loadtest/sample_log.jsonl
+  python -m loadtest --log loadtest/sample_log.jsonl --concurrency 16 --rate 5 --repeat 3
+  python -m loadtest --log my_log.jsonl --workers 2 --env RESULT_CACHE_SIZE=0 --output run.json
+  python -m loadtest --log my_log.jsonl --target http://localhost:8000 --pid 12345
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+import httpx
+
+# __main__.py
+
+
+def load_log(path: str) -> List[Dict]:
+    """Read a JSONL request log, skipping blank lines."""
+    entries = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "path" not in entry:
+                raise ValueError(f"{path}:{line_number}: missing 'path'")
+            entries.append(entry)
+    return entries
+
+
+def schedule(entries: List[Dict], repeat: int, rate: Optional[float], poisson: bool, speed: float) -> List[tuple]:
+    """
+    Return (arrival offset in seconds, entry) pairs.
+    --rate gives an open-loop arrival rate; otherwise recorded "at" offsets are
+    replayed (scaled by --speed); with neither, every request is due at once and
+    --concurrency alone paces the run.
+    """
+    plan = []
+    clock = 0.0
+    span = max((entry.get("at", 0.0) for entry in entries), default=0.0)
+    for round_number in range(repeat):
+        for entry in entries:
+            if rate:
+                plan.append((clock, entry))
+                clock += random.expovariate(rate) if poisson else 1.0 / rate
+            elif "at" in entry:
+                plan.append(((round_number * span + entry["at"]) / speed, entry))
+            else:
+                plan.append((0.0, entry))
+    return sorted(plan, key=lambda item: item[0])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app_path: str, port: int, env: Dict[str, str], workers: int = 1) -> subprocess.Popen:
+    """Run an ASGI app under uvicorn in a child process."""
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", app_path,
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        env={**os.environ, **env},
+    )
+
+
+def wait_ready(url: str, process: Optional[subprocess.Popen], timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server for {url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=2.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start within {timeout:.0f}s")
+
+
+def tree_rss_bytes(pid: int) -> Optional[int]:
+    """Resident memory of a process and all its descendants (Linux /proc only)."""
+    total = 0
+    pending = [pid]
+    seen = set()
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+            task_dir = f"/proc/{current}/task"
+            for task in os.listdir(task_dir):
+                with open(f"{task_dir}/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            if current == pid:
+                return None
+    return total
+
+
+class RSSSampler:
+    """Samples the RSS of a process tree in a background thread and keeps the peak."""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.1):
+        self.pid = pid
+        self.interval = interval
+        self.baseline = tree_rss_bytes(pid) if pid else None
+        self.peak = self.baseline
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            rss = tree_rss_bytes(self.pid)
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        if self.pid:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+async def replay(base_url: str, plan: List[tuple], concurrency: int, timeout: float) -> Dict:
+    """
+    Fire the planned requests and record one result per request.
+    Latency is measured from the scheduled arrival time, so time spent waiting
+    for a free concurrency slot counts (no coordinated omission).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+    in_flight = 0
+    peak_in_flight = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+
+        async def fire(offset: float, entry: Dict) -> None:
+            nonlocal in_flight, peak_in_flight
+            await asyncio.sleep(max(0.0, start + offset - time.perf_counter()))
+            scheduled = start + offset
+            async with semaphore:
+                in_flight += 1
+                peak_in_flight = max(peak_in_flight, in_flight)
+                status, error, size = None, None, 0
+                try:
+                    response = await client.request(
+                        entry.get("method", "GET"),
+                        entry["path"],
+                        params=entry.get("params"),
+                        headers=entry.get("headers"),
+                    )
+                    status, size = response.status_code, len(response.content)
+                except httpx.HTTPError as e:
+                    error = type(e).__name__
+                finally:
+                    in_flight -= 1
+            results.append({
+                "request_id": entry.get("request_id"),
+                "path": entry["path"],
+                "status": status,
+                "error": error,
+                "bytes": size,
+                "latency": time.perf_counter() - scheduled,
+            })
+
+        await asyncio.gather(*(fire(offset, entry) for offset, entry in plan))
+        wall = time.perf_counter() - start
+
+    return {"results": results, "wall": wall, "peak_in_flight": peak_in_flight}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize_group(results: List[Dict], wall: float) -> Dict:
+    latencies = [r["latency"] for r in results]
+    failed = [r for r in results if r["error"] or (r["status"] or 0) >= 400]
+    return {
+        "requests": len(results),
+        "errors": len(failed),
+        "error_rate": round(len(failed) / len(results), 4) if results else 0.0,
+        "throughput_rps": round(len(results) / wall, 3) if wall else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p90": round(percentile(latencies, 90) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+            "max": round(max(latencies) * 1000, 1),
+            "mean": round(statistics.fmean(latencies) * 1000, 1),
+        } if latencies else {},
+        "statuses": {
+            str(status): sum(1 for r in results if (r["status"] or r["error"]) == status)
+            for status in sorted({r["status"] or r["error"] for r in results}, key=str)
+        },
+    }
+
+
+def summarize(run: Dict, sampler: RSSSampler, config: Dict) -> Dict:
+    results = run["results"]
+    by_path = {}
+    for result in results:
+        by_path.setdefault(result["path"], []).append(result)
+
+    mb = lambda value: round(value / 1024**2, 1) if value is not None else None
+    memory = {"baseline_rss_mb": mb(sampler.baseline), "peak_rss_mb": mb(sampler.peak)}
+    if sampler.baseline is not None and sampler.peak is not None and run["peak_in_flight"]:
+        memory["rss_per_in_flight_mb"] = mb((sampler.peak - sampler.baseline) / run["peak_in_flight"])
+
+    return {
+        "config": config,
+        "wall_seconds": round(run["wall"], 3),
+        "peak_in_flight": run["peak_in_flight"],
+        "memory": memory,
+        "overall": summarize_group(results, run["wall"]),
+        "endpoints": {path: summarize_group(group, run["wall"]) for path, group in sorted(by_path.items())},
+    }
+
+
+def print_report(report: Dict) -> None:
+    overall = report["overall"]
+    print(f"\nRequests: {overall['requests']}  wall: {report['wall_seconds']}s  "
+          f"throughput: {overall['throughput_rps']} req/s  peak in-flight: {report['peak_in_flight']}")
+    memory = report["memory"]
+    if memory["peak_rss_mb"] is not None:
+        line = f"RSS: baseline {memory['baseline_rss_mb']} MB, peak {memory['peak_rss_mb']} MB"
+        if "rss_per_in_flight_mb" in memory:
+            line += f", ~{memory['rss_per_in_flight_mb']} MB per in-flight request"
+        print(line)
+    else:
+        print("RSS: not measured (pass --pid for an external target; Linux only)")
+
+    print(f"\n{'endpoint':<28}{'reqs':>6}{'err%':>7}{'rps':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    rows = list(report["endpoints"].items()) + [("TOTAL", overall)]
+    for path, stats in rows:
+        latency = stats["latency_ms"]
+        print(f"{path:<28}{stats['requests']:>6}{stats['error_rate'] * 100:>6.1f}%{stats['throughput_rps']:>8}"
+              f"{latency.get('p50', 0):>10}{latency.get('p90', 0):>10}{latency.get('p99', 0):>10}{latency.get('max', 0):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", required=True, help="JSONL request log to replay")
+    parser.add_argument("--concurrency", type=int, default=8, help="Max requests in flight")
+    parser.add_argument("--rate", type=float, help="Arrival rate in requests/second (default: recorded 'at' offsets)")
+    parser.add_argument("--poisson", action="store_true", help="Exponential inter-arrival times with --rate")
+    parser.add_argument("--speed", type=float, default=1.0, help="Speed-up factor for recorded 'at' offsets")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the log this many times")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Per-request timeout in seconds")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the spawned API")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the spawned API (repeatable)")
+    parser.add_argument("--target", help="Use an already running API at this URL instead of spawning one")
+    parser.add_argument("--pid", type=int, help="PID of the --target server, to measure its RSS")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for Poisson arrivals")
+    parser.add_argument("--output", help="Write the full report as JSON to this file")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    entries = load_log(args.log)
+    plan = schedule(entries, args.repeat, args.rate, args.poisson, args.speed)
+
+    processes = []
+    try:
+        if args.target:
+            base_url, api_pid = args.target.rstrip("/"), args.pid
+        else:
+            mock_port, fixture_port, api_port = free_port(), free_port(), free_port()
+            mock_url = f"http://127.0.0.1:{mock_port}"
+            fixture_url = f"http://127.0.0.1:{fixture_port}"
+            base_url = f"http://127.0.0.1:{api_port}"
+
+            processes.append(start_server("loadtest.mock_llm:app", mock_port, {}))
+            processes.append(start_server("loadtest.fixture_gutenberg:app", fixture_port, {}))
+            wait_ready(f"{mock_url}/api/tags", processes[0])
+            wait_ready(fixture_url, processes[1])
+
+            api_env = {
+                "PROVIDER": "ollama",
+                "LLM_BACKEND": "native",
+                "OLLAMA_BASE_URL": mock_url,
+                "OLLAMA_MODEL": "mock-llm",
+                "OPENAI_API_KEY": "mock",
+                "OPENAI_API_URL": f"{mock_url}/v1/chat/completions",
+                "GROQ_API_KEY": "mock",
+                "GROQ_API_URL": f"{mock_url}/v1/chat/completions",
+                "SAMBANOVA_API_KEY": "mock",
+                "SAMBANOVA_API_URL": f"{mock_url}/v1/chat/completions",
+                "GUTENBERG_BASE_URL": fixture_url,
+            }
+            api_env.update(item.split("=", 1) for item in args.env)
+            api = start_server("app.main:app", api_port, api_env, workers=args.workers)
+            processes.append(api)
+            wait_ready(f"{base_url}/api/health", api)
+            api_pid = api.pid
+
+        print(f"Replaying {len(plan)} requests against {base_url} "
+              f"(concurrency {args.concurrency}, rate {args.rate or 'recorded/unpaced'})")
+        with RSSSampler(api_pid) as sampler:
+            run = asyncio.run(replay(base_url, plan, args.concurrency, args.timeout))
+
+        report = summarize(run, sampler, {
+            "log": args.log,
+            "requests": len(plan),
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "poisson": args.poisson,
+            "repeat": args.repeat,
+            "workers": args.workers if not args.target else None,
+            "target": base_url,
+            "env": args.env,
+        })
+        print_report(report)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"\nReport written to {args.output}")
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+if __name__ == "__main__":
+    main()
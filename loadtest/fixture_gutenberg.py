@@ -0,0 +1,69 @@
+import os
+import random
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
+
+# fixture_gutenberg.py
+#
+# Stand-in for www.gutenberg.org. Every book ID returns a deterministic synthetic
+# novel with chapters, a recurring cast and Gutenberg header/footer markers.
+
+BOOK_CHARS = int(os.getenv("FIXTURE_BOOK_CHARS", "60000"))
+CHAPTER_CHARS = int(os.getenv("FIXTURE_CHAPTER_CHARS", "6000"))
+MISSING_BOOK_IDS = {int(x) for x in os.getenv("FIXTURE_MISSING_IDS", "999999999").split(",") if x.strip()}
+
+FIRST_NAMES = [
+    "Elizabeth", "Jane", "Charles", "Fitzwilliam", "Catherine", "George", "Lydia", "Mary",
+    "Edward", "Anne", "Frederick", "Emma", "Henry", "Harriet", "Robert", "Margaret",
+]
+LAST_NAMES = ["Bennet", "Darcy", "Bingley", "Wickham", "Collins", "Lucas", "Woodhouse", "Knightley"]
+VERBS = ["spoke with", "walked beside", "quarrelled with", "wrote to", "danced with", "smiled at", "visited"]
+FILLER = [
+    "The morning was grey and the road was long.",
+    "Nothing more was said of the matter that evening.",
+    "It was a truth that few in the county would dispute.",
+    "The letter lay unopened upon the table.",
+]
+
+app = FastAPI(title="Gutenberg fixture server")
+
+
+def make_book(book_id: int) -> str:
+    """Deterministic synthetic book text for a book ID."""
+    rng = random.Random(book_id)
+    cast = [f"{first} {rng.choice(LAST_NAMES)}" for first in rng.sample(FIRST_NAMES, 8)]
+
+    chapters = []
+    total = 0
+    number = 1
+    while total < BOOK_CHARS:
+        sentences = []
+        length = 0
+        while length < CHAPTER_CHARS:
+            if rng.random() < 0.6:
+                a, b = rng.sample(cast, 2)
+                sentence = f"{a} {rng.choice(VERBS)} {b}."
+            else:
+                sentence = rng.choice(FILLER)
+            sentences.append(sentence)
+            length += len(sentence) + 1
+        body = "\n\n".join(" ".join(sentences[i:i + 6]) for i in range(0, len(sentences), 6))
+        chapters.append(f"CHAPTER {number}\n\n{body}")
+        total += len(body)
+        number += 1
+
+    return (
+        f"The Project Gutenberg eBook of Fixture Book {book_id}\n\n"
+        f"*** START OF THE PROJECT GUTENBERG EBOOK FIXTURE BOOK {book_id} ***\n\n"
+        + "\n\n\n".join(chapters)
+        + f"\n\n*** END OF THE PROJECT GUTENBERG EBOOK FIXTURE BOOK {book_id} ***\n"
+    )
+
+
+@app.get("/cache/epub/{book_id}/pg{book_id2}.txt", response_class=PlainTextResponse)
+@app.get("/files/{book_id}/{book_id2}.txt", response_class=PlainTextResponse)
+@app.get("/files/{book_id}/{book_id2}-0.txt", response_class=PlainTextResponse)
+def book_text(book_id: int, book_id2: int):
+    if book_id != book_id2 or book_id in MISSING_BOOK_IDS:
+        raise HTTPException(status_code=404, detail="Not found")
+    return make_book(book_id)
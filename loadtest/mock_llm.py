@@ -0,0 +1,101 @@
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from itertools import combinations
+from fastapi import FastAPI, Request
+
+# mock_llm.py
+#
+# Local stand-in for an LLM server. Speaks the Ollama API (/api/chat, /api/generate,
+# /api/tags, /api/ps) and OpenAI-compatible chat completions, answering with the
+# analyzer's JSON shape built from the names found in the prompt.
+
+LATENCY_MS = float(os.getenv("MOCK_LLM_LATENCY_MS", "300"))
+JITTER_MS = float(os.getenv("MOCK_LLM_JITTER_MS", "100"))
+# Requests processed at once, like Ollama's parallel slots; the rest queue
+SLOTS = int(os.getenv("MOCK_LLM_SLOTS", "4"))
+MODEL = os.getenv("MOCK_LLM_MODEL", "mock-llm:latest")
+
+NAME = re.compile(r"\b[A-Z][a-z]+ [A-Z][a-z]+\b")
+
+app = FastAPI(title="Mock LLM server")
+slots = asyncio.Semaphore(SLOTS)
+
+
+def build_answer(prompt: str) -> dict:
+    """Characters and interactions for the excerpt at the end of an analysis prompt."""
+    text = prompt.rsplit("Text to analyze:", 1)[-1]
+    counts = {}
+    for name in NAME.findall(text):
+        counts[name] = counts.get(name, 0) + 1
+    characters = [
+        {"name": name, "aliases": [name.split()[0]], "mention_count": count, "sample_quotes": []}
+        for name, count in sorted(counts.items())
+    ]
+    interactions = [
+        {"source": a, "target": b, "weight": 1, "sample_quotes": []}
+        for a, b in list(combinations(sorted(counts), 2))[:20]
+    ]
+    return {"characters": characters, "interactions": interactions}
+
+
+async def generate(prompt: str) -> tuple:
+    """Simulate inference time inside a slot. Returns (answer text, elapsed ns)."""
+    start = time.perf_counter_ns()
+    async with slots:
+        delay = max(0.0, random.gauss(LATENCY_MS, JITTER_MS)) / 1000
+        await asyncio.sleep(delay)
+    return json.dumps(build_answer(prompt)), time.perf_counter_ns() - start
+
+
+@app.post("/api/chat")
+async def ollama_chat(request: Request):
+    body = await request.json()
+    prompt = body["messages"][-1]["content"]
+    content, elapsed = await generate(prompt)
+    return {
+        "model": body.get("model", MODEL),
+        "message": {"role": "assistant", "content": content},
+        "done": True,
+        "done_reason": "stop",
+        "total_duration": elapsed,
+        "prompt_eval_count": len(prompt) // 4,
+        "eval_count": len(content) // 4,
+    }
+
+
+@app.post("/api/generate")
+async def ollama_generate(request: Request):
+    # Warm-up requests send an empty prompt and only load the model
+    body = await request.json()
+    if not body.get("prompt"):
+        return {"model": body.get("model", MODEL), "response": "", "done": True, "done_reason": "load"}
+    content, elapsed = await generate(body["prompt"])
+    return {"model": body.get("model", MODEL), "response": content, "done": True, "total_duration": elapsed}
+
+
+@app.get("/api/tags")
+def ollama_tags():
+    return {"models": [{"name": MODEL, "size": 2 * 1024**3, "modified_at": "2025-01-01T00:00:00Z"}]}
+
+
+@app.get("/api/ps")
+def ollama_ps():
+    return {"models": [{"name": MODEL, "size": 2 * 1024**3, "size_vram": 2 * 1024**3}]}
+
+
+@app.post("/v1/chat/completions")
+async def openai_chat(request: Request):
+    body = await request.json()
+    prompt = body["messages"][-1]["content"]
+    content, _ = await generate(prompt)
+    return {
+        "id": "mock",
+        "object": "chat.completion",
+        "model": body.get("model", MODEL),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4},
+    }